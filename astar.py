@@ -21,36 +21,50 @@ THE SOFTWARE.
 '''
 
 import os
+import multiprocessing
 from score.score import Score
 from score.scoreevent import Note, Chord
 from guitar.guitarevent import Pluck, Strum
 from guitar.guitar import Guitar
-import networkx as nx
-import itertools
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    # fall back to relaxing the layers with numpy
+    njit = None
 
 class ArrangeTabAstar(object):
     '''
     AStar class that forms a graph from a music score
     '''
 
-    def __init__(self, score, guitar):
+    # weights and thresholds of the biomechanical cost
+    w_distance = 2                  # distance weight
+    w_fret_penalty = 1              # fret penalty weight
+    fret_threshold = 7              # start incurring penalties above fret 7
+    w_chord_distance = 2
+    w_chord_string_distance = 1
+
+    def __init__(self, score, guitar, processes=1):
         self.score = score
         self.guitar = guitar
-        self.graph = None
+        # number of processes generating candidates for the score events
+        self.processes = processes
+        # (score_event, candidates) for each score event that can be played
+        self.layers = None
+        # edge cost matrices between consecutive layers
+        self.weights = None
 
     def gen_tab(self, output_path=None):
-        self.graph = self._gen_graph()
+        self.layers, self.weights = self._gen_layers()
 
-        # run the A* algorithm
-        path = nx.astar_path(self.graph, 1, self.graph.number_of_nodes())
-        # remove start and end nodes
-        del path[0], path[-1]
+        # find the cheapest sequence of candidates through the layers
+        path = self._shortest_path()
 
         strums = []
-        for n in path:
-            n = self.graph.node[n]
-            guitar_event = n['guitar_event']
-            score_event = n['score_event']
+        for (score_event, candidates), c in zip(self.layers, path):
+            guitar_event = candidates[c]
 
             plucks = []
             if isinstance(guitar_event, Pluck):
@@ -65,28 +79,33 @@ class ArrangeTabAstar(object):
         if ext == ".mei":
             from pymei import XmlExport
 
+            # look up note elements by id in one pass over the document
+            id_map = dict((n.getId(), n) for n in self.score.doc.getElementsByName('note'))
+
             # add the tablature data to the original mei document
             for s in strums:
                 for p in s:
-                    note = self.score.doc.getElementById(p[0])                
+                    note = id_map[p[0]]
                     note.addAttribute('tab.string', str(p[1].string+1))
                     note.addAttribute('tab.fret', str(p[1].fret))
 
             if output_path is not None:
                 # write the modified document to disk
-                XmlExport.meiDocumentToFile(self.score.mei, output_path)
+                XmlExport.meiDocumentToFile(self.score.doc, output_path)
             else:
                 # return a string of the MeiDocument
-                return XmlExport.meiDocumentToText(self.score.mei)
+                return XmlExport.meiDocumentToText(self.score.doc)
         elif ext == ".xml":
             from lxml import etree
 
+            # look up note elements by id in one pass over the document
+            id_map = dict((n.get("id"), n) for n in self.score.doc.iter("note"))
+
             # add the tablature data to the original MusicXML document
             for s in strums:
                 for p in s:
-                    try:
-                        note = self.score.doc.xpath("part/measure/note[@id='%s']" % p[0])[0]
-                    except IndexError:
+                    note = id_map.get(p[0])
+                    if note is None:
                         raise ValueError("Oh snap! We couldn't find note id=%s in the MusicXML document" % p[0])
 
                     # add string and fret information to note
@@ -123,50 +142,92 @@ class ArrangeTabAstar(object):
                 # return a string of the MusicXML document
                 return etree.tostring(self.score.doc)
 
-    def _gen_graph(self):
-        dg = nx.DiGraph()
+    def _gen_layers(self):
+        '''
+        Form the layered graph of candidate guitar events. Every candidate of
+        a layer is connected to every candidate of the following layer, so the
+        graph is stored as a list of candidates per layer along with a matrix
+        of edge costs [prev_candidate, candidate] for each layer.
+        '''
 
-        # start node for the search agent
-        dg.add_node(1, guitar_event='start')
+        layers = []
+        weights = []
 
-        prev_node_layer = [1]
-        node_num = 2
-        num_nodes = len(self.score.score_events)
-        for i, e in enumerate(self.score.score_events):
+        score_events = self.score.score_events
+        for e in score_events:
             # make sure chord has a polyphony <= 6
             if isinstance(e, Chord) and len(e.notes) > 6:
-                e.notes = enotes[:6]
+                e.notes = e.notes[:6]
+
+        # generate all possible fretboard combinations for each event
+        if self.processes > 1:
+            pool = multiprocessing.Pool(self.processes)
+            try:
+                event_candidates = pool.map(_get_candidates_worker, [(self.guitar, e) for e in score_events], chunksize=32)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            event_candidates = [self._get_candidates(e) for e in score_events]
 
-            # generate all possible fretboard combinations for this event
-            candidates = self._get_candidates(e)
+        # start node for the search agent
+        prev_features = None
+        for e, candidates in zip(score_events, event_candidates):
             if len(candidates) == 0:
                 continue
 
-            node_layer = []
-            for c in candidates:
-                # each candidate position becomes a node on the graph
-                dg.add_node(node_num, guitar_event=c, score_event=e)
-                node_layer.append(node_num)
+            # calculate edge weights between this layer and the previous layer
+            features = ArrangeTabAstar._candidate_features(candidates)
+            if isinstance(e, Chord):
+                candidates, features = ArrangeTabAstar._prune_dominated(candidates, features)
+            w = ArrangeTabAstar.biomechanical_burlet_matrix(prev_features, features)
 
-                # form edges between this node and nodes in previous layer
-                edges = []
-                for prev_node in prev_node_layer:
-                    # calculate edge weight
-                    w = ArrangeTabAstar.biomechanical_burlet(dg.node[prev_node]['guitar_event'], dg.node[node_num]['guitar_event'])
-                    edges.append((prev_node, node_num, w))
-                dg.add_weighted_edges_from(edges)
+            layers.append((e, candidates))
+            weights.append(w)
 
-                node_num += 1
+            prev_features = features
 
-            prev_node_layer = node_layer
+        return layers, weights
 
-        # end node for the search agent
-        dg.add_node(node_num, guitar_event='end')
-        edges = [(prev_node, node_num, 0) for prev_node in prev_node_layer]
-        dg.add_weighted_edges_from(edges)
+    def _shortest_path(self):
+        '''
+        Calculate the cheapest path from the start node through the layers.
+        Since edges only connect consecutive layers, a single forward pass
+        finds the cheapest cost of reaching each candidate.
+
+        RETURNS
+        -------
+        path (list): index of the chosen candidate in each layer
+        '''
+
+        if not self.layers:
+            return []
+
+        # cost of reaching each candidate of the first layer from the start node
+        dp = self.weights[0][0]
+        backpointers = []
+        for w in self.weights[1:]:
+            if njit is not None:
+                dp_next = np.empty(w.shape[1], dtype=np.float32)
+                back = np.empty(w.shape[1], dtype=np.int32)
+                _relax(dp, w, dp_next, back)
+                dp = dp_next
+            else:
+                costs = dp[:,np.newaxis] + w
+                back = np.argmin(costs, axis=0).astype(np.int32)
+                dp = costs[back, np.arange(costs.shape[1])]
+            backpointers.append(back)
+
+        # trace back from the cheapest candidate of the last layer
+        c = int(np.argmin(dp))
+        path = [c]
+        for back in reversed(backpointers):
+            c = int(back[c])
+            path.append(c)
+        path.reverse()
+
+        return path
 
-        return dg
-    
     @staticmethod
     def biomechanical_burlet(n1, n2):
         '''
@@ -179,7 +240,6 @@ class ArrangeTabAstar(object):
         '''        
 
         distance = 0            # biomechanical distance
-        w_distance = 2          # distance weight
 
         if n1 != 'start':
             # calculate distance between nodes
@@ -187,36 +247,90 @@ class ArrangeTabAstar(object):
                 distance = n1.distance(n2)
 
         fret_penalty = 0
-        w_fret_penalty = 1      # fret penalty weight
-        fret_threshold = 7      # start incurring penalties above fret 7
-
         chord_distance = 0
-        w_chord_distance = 2
-
         chord_string_distance = 0       # penalty for holes between string strums
-        w_chord_string_distance = 1
 
         if isinstance(n2, Pluck):
-            if n2.fret > fret_threshold:
+            if n2.fret > ArrangeTabAstar.fret_threshold:
                 fret_penalty += 1
         else:
-            frets = [p.fret for p in n2.plucks]
-            if max(frets) > fret_threshold:
+            if n2._max_fret > ArrangeTabAstar.fret_threshold:
                 fret_penalty += 1
 
-            chord_distance = max(frets) - min(frets)
+            chord_distance = n2._max_fret - n2._min_fret
+            chord_string_distance = n2._chord_string_distance
+
+        return (ArrangeTabAstar.w_distance*distance + ArrangeTabAstar.w_fret_penalty*fret_penalty
+                + ArrangeTabAstar.w_chord_distance*chord_distance + ArrangeTabAstar.w_chord_string_distance*chord_string_distance)
+
+    @staticmethod
+    def biomechanical_burlet_matrix(prev_features, features):
+        '''
+        Evaluate the biomechanical cost of moving from every candidate of a
+        layer to every candidate of the following layer at once. Equivalent
+        to calling biomechanical_burlet on each pair of candidates.
+
+        PARAMETERS
+        ----------
+        prev_features: features of the previous layer, None for the start node
+        features: features of the following layer (see _candidate_features)
+
+        RETURNS
+        -------
+        w (np.ndarray): edge costs [prev_candidate, candidate]
+        '''
+
+        is_strum, min_fret, max_fret, cost = [f[np.newaxis,:] for f in features]
+
+        if prev_features is None:
+            # no movement is required from the start node
+            return cost.astype(np.float32)
+
+        prev_is_strum, prev_min_fret, prev_max_fret, _ = [f[:,np.newaxis] for f in prev_features]
 
-            strings = sorted([p.string for p in n2.plucks])
-            for i in range(len(strings)-1,-1,-1):
-                if i-1 < 0:
-                    break
-                s2 = strings[i]
-                s1 = strings[i-1]
-                chord_string_distance += (s2-s1)
-                
-            chord_string_distance -= len(strings)-1
-        
-        return w_distance*distance + w_fret_penalty*fret_penalty + w_chord_distance*chord_distance + w_chord_string_distance*chord_string_distance
+        # pluck to pluck or strum to strum: difference of the highest frets,
+        # unless either position is open
+        same = np.where((prev_max_fret == 0) | (max_fret == 0), 0, np.abs(prev_max_fret - max_fret))
+
+        # pluck to strum or strum to pluck: distance of the pluck from the fret span of the strum
+        fret = np.where(prev_is_strum, max_fret, prev_max_fret)
+        span_min = np.where(prev_is_strum, prev_min_fret, min_fret)
+        span_max = np.where(prev_is_strum, prev_max_fret, max_fret)
+        mixed = np.where(fret <= span_min, span_min - fret,
+                np.where(fret >= span_max, fret - span_max, np.abs(fret - (span_min+span_max)//2)))
+
+        distance = np.where(prev_is_strum == is_strum, same, mixed)
+        # no movement is required from an open position
+        distance = np.where(prev_max_fret == 0, 0, distance)
+
+        return (ArrangeTabAstar.w_distance*distance + cost).astype(np.float32)
+
+    @staticmethod
+    def _candidate_features(candidates):
+        '''
+        Summarize the candidates of a layer as arrays for biomechanical_burlet_matrix.
+
+        RETURNS
+        -------
+        features (tuple): arrays (is_strum, min_fret, max_fret, cost), where cost
+            is the part of the biomechanical cost that only depends on the candidate
+        '''
+
+        num_candidates = len(candidates)
+        is_strum = np.zeros(num_candidates, dtype=np.bool_)
+        min_fret = np.empty(num_candidates, dtype=np.int32)
+        max_fret = np.empty(num_candidates, dtype=np.int32)
+        cost = np.empty(num_candidates, dtype=np.int32)
+        for i, c in enumerate(candidates):
+            if isinstance(c, Pluck):
+                min_fret[i] = max_fret[i] = c.fret
+            else:
+                is_strum[i] = True
+                min_fret[i] = c._min_fret
+                max_fret[i] = c._max_fret
+            cost[i] = ArrangeTabAstar.biomechanical_burlet('start', c)
+
+        return is_strum, min_fret, max_fret, cost
 
     def _get_candidates(self, score_event):
         '''
@@ -229,25 +343,123 @@ class ArrangeTabAstar(object):
         elif isinstance(score_event, Chord):
             plucks = [self.guitar.get_candidate_frets(n) for n in score_event.notes]
 
-            # get all combinations of plucks
-            pluck_combinations = list(itertools.product(*plucks))
-
-            # filter combinations to those that are valid strums
-            # i.e., ensure plucks are not on the same string
-            for c in pluck_combinations:
-                active_strings = [p.string for p in c]
-                if len(active_strings) == len(set(active_strings)):
-                    frets = [p.fret for p in c if p.fret > 0]
-                    if len(frets):
-                        if max(frets) - min(frets) <= 7:
-                            # this combination of notes is good
-                            # convert back to internal data format (Strum)
-                            candidates.append(Strum(c))
-                    else:
-                        candidates.append(Strum(c))
+            def add_strums(i, used_strings, partial, min_fret, max_fret):
+                '''
+                Helper function that enumerates the combinations of plucks
+                for the notes i, i+1, ... of the chord, skipping plucks on
+                strings that are already used by a previous note and plucks
+                that stretch the fretted notes over more than 7 frets.
+
+                PARAMETERS:
+                i (int): index of the note to place
+                used_strings (int): bitmask of the strings played by the plucks in partial
+                partial (list): plucks chosen for the previous notes
+                min_fret (int): lowest fretted fret in partial, inf if none
+                max_fret (int): highest fretted fret in partial, 0 if none
+                '''
+
+                if i == len(plucks):
+                    # this combination of notes is good
+                    # convert back to internal data format (Strum)
+                    candidates.append(Strum(tuple(partial)))
+                    return
+
+                for p in plucks[i]:
+                    string_bit = 1 << p.string
+                    if used_strings & string_bit:
+                        continue
+
+                    p_min_fret, p_max_fret = min_fret, max_fret
+                    if p.fret > 0:
+                        p_min_fret = min(min_fret, p.fret)
+                        p_max_fret = max(max_fret, p.fret)
+                        if p_max_fret - p_min_fret > 7:
+                            continue
+
+                    partial.append(p)
+                    add_strums(i+1, used_strings | string_bit, partial, p_min_fret, p_max_fret)
+                    partial.pop()
+
+            add_strums(0, 0, [], float('inf'), 0)
 
         return candidates
 
+    @staticmethod
+    def _prune_dominated(strums, features):
+        '''
+        Discard strums that are dominated by another strum of the same chord.
+        The distance between a strum and any other guitar event only depends
+        on the lowest and highest fret of the strum, so of all strums spanning
+        the same frets only the one with the lowest cost can be on an optimal path.
+
+        PARAMETERS
+        ----------
+        strums (list): strum candidates of a chord
+        features (tuple): arrays of the strums from _candidate_features
+
+        RETURNS
+        -------
+        strums (list): remaining strums, ordered by span and cost
+        features (tuple): arrays of the remaining strums
+        '''
+
+        _, min_fret, max_fret, cost = features
+
+        # stable sort, so strums of equal span and cost keep their order
+        order = np.lexsort((cost, max_fret, min_fret))
+        keep = []
+        prev_span = None
+        for i in order:
+            span = (min_fret[i], max_fret[i])
+            if span != prev_span:
+                keep.append(i)
+                prev_span = span
+
+        keep = np.array(keep, dtype=np.intp)
+        return [strums[i] for i in keep], tuple(f[keep] for f in features)
+
+def _relax(dp_prev, w, dp_next, back):
+    '''
+    Calculate the cheapest cost of reaching each candidate of a layer
+    from the candidates of the previous layer. Compiled with numba when
+    it is installed.
+
+    PARAMETERS
+    ----------
+    dp_prev (np.ndarray): cheapest cost of reaching each previous candidate
+    w (np.ndarray): edge costs [prev_candidate, candidate]
+    dp_next (np.ndarray): output, cheapest cost of reaching each candidate
+    back (np.ndarray): output, previous candidate on the cheapest path
+    '''
+
+    num_prev, num_cur = w.shape
+    for j in range(num_cur):
+        best = np.inf
+        arg = 0
+        for k in range(num_prev):
+            v = dp_prev[k] + w[k,j]
+            if v < best:
+                best = v
+                arg = k
+        dp_next[j] = best
+        back[j] = arg
+
+if njit is not None:
+    _relax = njit(cache=True)(_relax)
+
+def _get_candidates_worker(args):
+    '''
+    Helper function that calculates the candidates of a score event
+    in a worker process, since bound methods cannot be pickled.
+
+    PARAMETERS
+    ----------
+    args (tuple): (guitar, score_event)
+    '''
+
+    guitar, score_event = args
+    return ArrangeTabAstar(None, guitar)._get_candidates(score_event)
+
 def get_guitar_model(mei_path):
     '''
     Helper function to form the guitar model from 
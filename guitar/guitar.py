@@ -44,6 +44,9 @@ class Guitar(object):
     }
 
     def __init__(self, num_frets=24, tuning='standard', capo=0):
+        # candidate (string, fret) pairs of each pitch that has been looked up
+        self._candidate_frets = {}
+
         self.num_frets = num_frets
 
         self.tuning = tuning
@@ -53,21 +56,53 @@ class Guitar(object):
         elif len(tuning.split(' ')) == 6:
             # this may be a string specifying the tuning
             # from thinnest to thickest string
-            self.strings = []
+            strings = []
             for s in tuning.split(' '):
                 # make sure this is a valid pitch/octave
                 try:
                     oct = int(s[-1])
                     pname = s[:-1]
                     n = Note(pname, oct)
-                    self.strings.append(n)
+                    strings.append(n)
                 except ValueError:
                     raise InvalidTuning('%s is not a valid tuning' % tuning)
+            self.strings = strings
         else:
             raise InvalidTuning('%s is not a valid tuning' % tuning)
 
         self.capo = capo
 
+    # the candidate frets of a pitch depend on the number of frets,
+    # the tuning and the capo, so changing any of them clears the cache
+
+    def _get_num_frets(self):
+        return self._num_frets
+
+    def _set_num_frets(self, num_frets):
+        self._num_frets = num_frets
+        self._candidate_frets = {}
+
+    num_frets = property(_get_num_frets, _set_num_frets)
+
+    def _get_strings(self):
+        return self._strings
+
+    def _set_strings(self, strings):
+        # stored as a tuple so the tuning cannot change without the setter
+        self._strings = tuple(strings)
+        self._candidate_frets = {}
+
+    strings = property(_get_strings, _set_strings)
+
+    def _get_capo(self):
+        return self._capo
+
+    def _set_capo(self, capo):
+        self._capo = capo
+        self._candidate_frets = {}
+
+    capo = property(_get_capo, _set_capo)
+
     def get_pitch_range(self):
         '''
         Calculate the pitch range of the guitar model using the number of frets,
@@ -85,6 +120,22 @@ class Guitar(object):
         Given a note, get all the candidate (string, fret) pairs
         where it could be played given the current guitar properties
         (number of strings, and tuning).
+        The candidates are cached by pitch until the number of frets,
+        the tuning or the capo changes, and are returned as a tuple
+        of Pluck objects that is shared between calls.
+        '''
+
+        key = (note.pname, note.oct)
+        candidates = self._candidate_frets.get(key)
+        if candidates is None:
+            candidates = self._find_candidate_frets(note)
+            self._candidate_frets[key] = candidates
+
+        return candidates
+
+    def _find_candidate_frets(self, note):
+        '''
+        Enumerate the candidate (string, fret) pairs of a note.
         '''
 
         candidates = []
@@ -96,13 +147,13 @@ class Guitar(object):
         for i, s in enumerate(open_strings):
             # calculate pitch difference from the open string note
             oct_diff = note.oct - s.oct
-            pname_diff = Note.pitch_classes.index(note.pname) - Note.pitch_classes.index(s.pname)
+            pname_diff = Note.semitones[note.pname] - Note.semitones[s.pname]
             pitch_diff = pname_diff + num_chroma*oct_diff
 
             if pitch_diff >= 0 and pitch_diff <= self.num_frets:
                 candidates.append(Pluck(i, pitch_diff))
 
-        return candidates
+        return tuple(candidates)
 
     def get_note(self, string, fret):
         '''
@@ -116,7 +167,7 @@ class Guitar(object):
         num_chroma = len(Note.pitch_classes)
         str_note = self.strings[string]
         oct_diff = int(fret/num_chroma)
-        i_str_pname = Note.pitch_classes.index(str_note.pname)
+        i_str_pname = Note.semitones[str_note.pname]
         i_note_pname = (i_str_pname + fret) % num_chroma
         if i_note_pname < i_str_pname:
             oct_diff += 1
@@ -43,35 +43,66 @@ class Strum(GuitarEvent):
 
     def add_pluck(self, pluck):
         self._plucks.append(pluck)
+        self._cache_shape()
 
     def del_pluck(self, string, fret):
         pluck = Pluck(string, fret)
-        self._plucks = filter(lambda n: n != pluck, self.plucks)
+        self._set_plucks(filter(lambda n: n != pluck, self.plucks))
 
     def _get_plucks(self):
         return self._plucks
 
     def _set_plucks(self, plucks):
         self._plucks = plucks
+        self._cache_shape()
 
     plucks = property(_get_plucks, _set_plucks)
 
+    def _cache_shape(self):
+        '''
+        Cache the fretboard shape of the strum, which is read
+        repeatedly when evaluating biomechanical costs.
+        '''
+
+        min_fret = max_fret = None
+        min_string = max_string = None
+        for p in self._plucks:
+            f = p.fret
+            if min_fret is None or f < min_fret:
+                min_fret = f
+            if max_fret is None or f > max_fret:
+                max_fret = f
+            s = p.string
+            if min_string is None or s < min_string:
+                min_string = s
+            if max_string is None or s > max_string:
+                max_string = s
+
+        self._min_fret = min_fret
+        self._max_fret = max_fret
+        self._is_open = max_fret is None or max_fret == 0
+
+        # number of strings skipped between the strummed strings
+        if len(self._plucks):
+            self._chord_string_distance = (max_string - min_string) - (len(self._plucks)-1)
+        else:
+            self._chord_string_distance = 0
+
     def distance(self, other):
         '''
         Get the distance between this strum and another pluck or strum
         '''
 
         if isinstance(other, Strum):
-            max_fret = max([p.fret for p in self.plucks])
-            other_max_fret = max([p.fret for p in other.plucks])
+            max_fret = self._max_fret
+            other_max_fret = other._max_fret
             if max_fret == 0 or other_max_fret == 0:
                 distance = 0
             else:
                 distance = max_fret - other_max_fret
         elif isinstance(other, Pluck):
-            frets = [p.fret for p in self.plucks]
-            min_fret = min(frets)
-            max_fret = max(frets)
+            min_fret = self._min_fret
+            max_fret = self._max_fret
 
             if other.fret <= min_fret:
                 distance = min_fret - other.fret
@@ -88,7 +119,7 @@ class Strum(GuitarEvent):
         '''
         True if the strum is all open strings
         '''
-        return all([p.fret == 0 for p in self._plucks])
+        return self._is_open
 
     def __str__(self):
         return '<strum: %s>' % ', '.join([p.__str__() for p in self._plucks])
@@ -115,9 +146,8 @@ class Pluck(GuitarEvent):
             else:
                 distance = self.fret - other.fret
         elif isinstance(other, Strum):
-            other_frets = [p.fret for p in other.plucks]
-            min_other_frets = min(other_frets)
-            max_other_frets = max(other_frets)
+            min_other_frets = other._min_fret
+            max_other_frets = other._max_fret
 
             if self.fret <= min_other_frets:
                 distance = min_other_frets - self.fret
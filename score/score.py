@@ -20,12 +20,34 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 '''
 
+from io import BytesIO
 from scoreevent import Note, Chord
 
+try:
+    from pymei import XmlImport
+except ImportError:
+    # pymei is only required for MEI scores
+    XmlImport = None
+
+try:
+    from lxml import etree
+    # note elements of a partwise MusicXML document
+    NOTES_XPATH = etree.XPath("part/measure/note")
+except ImportError:
+    # lxml is only required for MusicXML scores
+    etree = None
+    NOTES_XPATH = None
+
 pitch_names = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
+# pitch class one semitone below each pitch name, e.g., Db -> C#, Fb -> E
+FLAT_TO_SHARP = dict((p, Note.pitch_classes[Note.semitones[p]-1]) for p in pitch_names)
+# pitch class one semitone above each pitch name, e.g., E# -> F, B# -> C
+SHARP_TO_PITCH = dict((p, Note.pitch_classes[(Note.semitones[p]+1) % len(Note.pitch_classes)]) for p in pitch_names)
 
 class Score(object):
 
+    __slots__ = ('score_events', 'doc')
+
     def __init__(self):
         '''
         Initialize a score 
@@ -50,32 +72,54 @@ class MeiScore(Score):
     Initialize an MEI score
     '''
 
+    __slots__ = ()
+
     def __init__(self):
         super(MeiScore, self).__init__()
 
-    def parse_str(self, mei_str):
+    def parse_str(self, mei_str, keep_doc=True):
         '''
         Read an mei file from string and fill the score model
+
+        PARAMETERS:
+        keep_doc (bool): keep the parsed document in self.doc, which is
+            needed to write the tablature back to the score
         '''
 
-        from pymei import XmlImport
+        if XmlImport is None:
+            raise ImportError('pymei is required to read MEI scores')
+
         self.doc = XmlImport.documentFromText(mei_str)
         self.parse_input()
+        if not keep_doc:
+            self.doc = None
 
-    def parse_file(self, mei_path):
+    def parse_file(self, mei_path, keep_doc=True):
         '''
         Read an mei file and fill the score model
+
+        PARAMETERS:
+        keep_doc (bool): keep the parsed document in self.doc, which is
+            needed to write the tablature back to the score
         '''
 
-        from pymei import XmlImport
+        if XmlImport is None:
+            raise ImportError('pymei is required to read MEI scores')
+
         self.doc = XmlImport.documentFromFile(str(mei_path))
         self.parse_input()
+        if not keep_doc:
+            self.doc = None
 
     def parse_input(self):
         '''
         Parse the score data into the internal data representation.
         '''
         
+        # score event handlers for the children of a layer
+        handlers = {'chord': self._handle_mei_chord, 'note': self._handle_mei_note}
+        append = self.score_events.append
+
         measures = self.doc.getElementsByName('measure')
         for m in measures:
             # only parse first staff (instrument), the instrument to convert to tablature
@@ -84,16 +128,22 @@ class MeiScore(Score):
             layer = staff.getChildrenByName('layer')[0]
             events = layer.getChildren()
             for e in events:
-                if e.getName() == 'chord':
-                    notes_in_chord = []
-                    for n in e.getChildrenByName('note'):
-                        note = self._handle_mei_note(n)    
-                        notes_in_chord.append(note)
-                    chord = Chord(notes_in_chord)
-                    self.score_events.append(chord)
-                elif e.getName() == 'note':
-                    note = self._handle_mei_note(e)
-                    self.score_events.append(note)
+                handler = handlers.get(e.getName())
+                if handler is not None:
+                    append(handler(e))
+
+    def _handle_mei_chord(self, chord):
+        '''
+        Helper function that takes an mei chord element
+        and creates a Chord object out of it.
+        '''
+
+        notes_in_chord = []
+        for n in chord.getChildrenByName('note'):
+            note = self._handle_mei_note(n)
+            notes_in_chord.append(note)
+
+        return Chord(notes_in_chord)
 
     def _handle_mei_note(self, note):
         '''
@@ -101,16 +151,22 @@ class MeiScore(Score):
         and creates a Note object out of it.
         '''
         
-        pname = note.getAttribute('pname').value
+        pname = note.getAttribute('pname').value.upper()
+        oct = int(note.getAttribute('oct').value)
         # append accidental to pname for internal model
         if note.hasAttribute('accid.ges'):
             accid = note.getAttribute('accid.ges').value
             if accid == 'f':
                 # convert to sharp
-                pname = pitch_names[pitch_names.index(pname)-1 % len(pitch_names)] + '#'
-            if accid == 's':
-                pname += '#'
-        oct = int(note.getAttribute('oct').value)
+                if pname == 'C':
+                    # C flat is the B of the octave below
+                    oct -= 1
+                pname = FLAT_TO_SHARP[pname]
+            elif accid == 's':
+                if pname == 'B':
+                    # B sharp is the C of the octave above
+                    oct += 1
+                pname = SHARP_TO_PITCH[pname]
         id = note.getId()
 
         return Note(pname, oct, id)
@@ -120,30 +176,89 @@ class MusicXMLScore(Score):
     Initialize a MusicXML score
     '''
 
+    __slots__ = ()
+
     def __init__(self):
         super(MusicXMLScore, self).__init__()
 
-    def parse_str(self, xml_str):
+    def parse_str(self, xml_str, keep_doc=True):
         '''
         Read a MusicXML file from string and fill the score model
+
+        PARAMETERS:
+        keep_doc (bool): keep the parsed document in self.doc, which is
+            needed to write the tablature back to the score
         '''
 
-        from lxml import etree
-        self.doc = etree.fromstring(xml_str)
-        self.parse_input()
+        if etree is None:
+            raise ImportError('lxml is required to read MusicXML scores')
+
+        if isinstance(xml_str, unicode):
+            xml_str = xml_str.encode('utf-8')
+        context = etree.iterparse(BytesIO(xml_str), events=('end',), tag='note', huge_tree=True)
+        self._parse_notes(self._iter_notes(context, clear=not keep_doc))
+        self.doc = context.root if keep_doc else None
 
-    def parse_file(self, xml_path):
+    def parse_file(self, xml_path, keep_doc=True):
         '''
         Read a MusicXML file and fill the score model
+
+        PARAMETERS:
+        keep_doc (bool): keep the parsed document in self.doc, which is
+            needed to write the tablature back to the score
         '''
 
-        from lxml import etree
-        self.doc = etree.parse(xml_path)
-        self.parse_input()
+        if etree is None:
+            raise ImportError('lxml is required to read MusicXML scores')
 
-    def parse_input(self):
+        # parse the notes while the document is being read
+        context = etree.iterparse(xml_path, events=('end',), tag='note', huge_tree=True)
+        self._parse_notes(self._iter_notes(context, clear=not keep_doc))
+        self.doc = etree.ElementTree(context.root) if keep_doc else None
+
+    @staticmethod
+    def _iter_notes(context, clear=False):
+        '''
+        Helper generator that yields the part/measure/note elements
+        of an lxml.etree.iterparse or iterwalk context in document order.
+
+        PARAMETERS:
+        context: lxml.etree.iterparse or iterwalk context of note end events
+        clear (bool): free each note and the elements before it once the
+            note has been parsed, so the document is never fully in memory
+        '''
+
+        for _, n in context:
+            measure = n.getparent()
+            if measure.tag == "measure" and measure.getparent().tag == "part":
+                yield n
+
+            if clear:
+                n.clear()
+                while n.getprevious() is not None:
+                    del n.getparent()[0]
+
+    def parse_input(self, root=None):
         '''
         Parse the score data into the internal data representation.
+
+        PARAMETERS:
+        root (lxml element or element tree): already parsed MusicXML
+            document, defaults to self.doc
+        '''
+
+        if root is None:
+            root = self.doc
+
+        context = etree.iterwalk(root, events=('end',), tag='note')
+        self._parse_notes(self._iter_notes(context))
+
+    def _parse_notes(self, notes):
+        '''
+        Parse MusicXML note elements into the internal data representation.
+
+        PARAMETERS:
+        notes (iterable): note elements in document order
         '''
 
         def prune_notes(active_chord):
@@ -174,35 +289,35 @@ class MusicXMLScore(Score):
             
             return score_event
 
-        notes = self.doc.findall("part/measure/note")
+        append = self.score_events.append
         active_notes = []
-        for i, n in enumerate(notes):
+        for i, n in enumerate(notes, 1):
             # append id to note elements so they can be retrieved later
-            n.set("id", str(i+1))
+            nid = str(i)
+            n.set("id", nid)
+
+            # tags of the children, to look for <chord/> and <rest/> in one pass
+            tags = set(c.tag for c in n)
+
+            if "chord" not in tags and len(active_notes):
+                # this note is not a member of the active chord,
+                # so the last note in the chord or the single note has been seen
+                score_event = prune_notes(active_notes)
+                if score_event:
+                    append(score_event)
+                active_notes = []
 
             # skip rests
-            if n.find("rest") is not None:
+            if "rest" in tags:
                 continue
 
-            note = self._handle_xml_note(n, str(i+1))
+            note = self._handle_xml_note(n, nid)
             active_notes.append(note)
 
-            if i+1 < len(notes):
-                # look ahead to see if next note element is a member of a chord
-                if notes[i+1].find("chord") is None:
-                    # this is the last note in a chord or is a single note
-                    score_event = prune_notes(active_notes)
-                    if score_event:
-                        self.score_events.append(score_event)
-                        active_notes = []
-                else:
-                    # a chord starts or continues
-                    continue
-            else:
-                # deal with note/chord at the end of the score
-                score_event = prune_notes(active_notes)
-                if score_event:
-                    self.score_events.append(score_event)
+        # deal with note/chord at the end of the score
+        score_event = prune_notes(active_notes)
+        if score_event:
+            append(score_event)
 
     def _handle_xml_note(self, n, nid):
         '''
@@ -217,16 +332,30 @@ class MusicXMLScore(Score):
         note (ScoreEvent.Note): note in internal note representation
         '''
 
-        pname = n.findtext("pitch/step")
-        octave = int(n.findtext("pitch/octave"))
+        # read the pitch, tablature and ties in a single pass over the children
+        pname = octave = alter = None
+        string = fret = None
+        tie_types = []
+        for child in n:
+            if child.tag == "pitch":
+                for p in child:
+                    if p.tag == "step":
+                        pname = p.text
+                    elif p.tag == "octave":
+                        octave = int(p.text)
+                    elif p.tag == "alter":
+                        alter = p.text
+            elif child.tag == "tie":
+                tie_types.append(child.get("type"))
+            elif child.tag == "notations" and string is None:
+                string = child.findtext("technical/string")
+                fret = child.findtext("technical/fret")
+
         note = Note(pname, octave, nid)
 
-        alter = n.findtext("pitch/alter")
         if alter:
             note = note + int(alter)
 
-        string = n.findtext("notations/technical/string")
-        fret = n.findtext("notations/technical/fret")
         if string and fret:
             note.string = int(string)
             note.fret = int(fret)
@@ -234,10 +363,8 @@ class MusicXMLScore(Score):
             note.string = None
             note.fret = None
 
-        ties = n.findall("tie")
-        if len(ties):
-            tie_types = [t.get("type") for t in ties]
-            if len(ties) == 1:
+        if len(tie_types):
+            if len(tie_types) == 1:
                 if "start" in tie_types:
                     # start tie
                     note._tie_state = "start"
@@ -259,7 +386,7 @@ class MusicXMLScore(Score):
         1. discarding id attribute on note elements that have been used for tablature arrangement
         '''
 
-        notes = self.doc.findall("part/measure/note")
-        for i, n in enumerate(notes):
+        notes = NOTES_XPATH(self.doc)
+        for n in notes:
             # 1. discard note id attributes
             del n.attrib["id"]
@@ -37,7 +37,7 @@ class ScoreEvent(object):
 
 class Chord(ScoreEvent):
 
-    def __init__(self, notes=[], **kwargs):
+    def __init__(self, notes=None, **kwargs):
         '''
         Creates a chord
 
@@ -49,6 +49,8 @@ class Chord(ScoreEvent):
 
         super(Chord, self).__init__(**kwargs)
 
+        if notes is None:
+            notes = []
         self._set_notes(notes)
 
     def add_note(self, note):
@@ -75,6 +77,8 @@ class Chord(ScoreEvent):
 class Note(ScoreEvent):
 
     pitch_classes = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+    # number of semitones above C of each pitch class
+    semitones = dict(zip(pitch_classes, range(len(pitch_classes))))
 
     def __init__(self, pname, oct, id=None, **kwargs):
         '''
@@ -103,7 +107,7 @@ class Note(ScoreEvent):
         between 0 and 127
         '''
 
-        p_ind = Note.pitch_classes.index(self.pname)
+        p_ind = Note.semitones[self.pname]
         num_chroma = len(Note.pitch_classes)
 
         midi = (self.oct-1)*num_chroma + 24 + p_ind
@@ -124,7 +128,7 @@ class Note(ScoreEvent):
             step_up = False
 
         note = Note(self.pname, self.oct, self.id)
-        p_ind = Note.pitch_classes.index(self.pname)
+        p_ind = Note.semitones[self.pname]
         new_p_ind = (p_ind + step) % num_chroma
 
         note.pname = Note.pitch_classes[new_p_ind]
@@ -153,13 +157,13 @@ class Note(ScoreEvent):
         return self.pname == other_note.pname and self.oct == other_note.oct
 
     def __lt__(self, other_note):
-        return self.oct < other_note.oct or (self.oct == other_note.oct and Note.pitch_classes.index(self.pname) < Note.pitch_classes.index(other_note.pname))
+        return self.oct < other_note.oct or (self.oct == other_note.oct and Note.semitones[self.pname] < Note.semitones[other_note.pname])
 
     def __le__(self, other_note):
         return self.__lt__(other_note) or self.__eq__(other_note)
 
     def __gt__(self, other_note):
-        return self.oct > other_note.oct or (self.oct == other_note.oct and Note.pitch_classes.index(self.pname) > Note.pitch_classes.index(other_note.pname))
+        return self.oct > other_note.oct or (self.oct == other_note.oct and Note.semitones[self.pname] > Note.semitones[other_note.pname])
 
     def __ge__(self, other_note):
         return self.__gt__(other_note) or self.__eq__(other_note)